@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import model_service
+import upload_store
+from data_analysis import optimize_dtypes
+
+OUTPUT_DIR = "outputs"
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Leave a core free for the API server
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# Registry of jobs started by this process: job_id -> status dict.
+# Every change is also written to outputs/{job_id}.json so status survives restarts
+# and is visible to other server processes; finished jobs are dropped from memory.
+jobs = {}
+
+# Only one batch job runs at a time: submitted jobs wait as 'pending' in this queue
+# and a single dispatcher thread runs them in order
+_queue = queue.Queue()
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+# Per-worker model cache, populated once by the pool initializer
+_pipeline = None
+_metadata = None
+
+
+def _init_worker(model_id):
+    global _pipeline, _metadata
+    _pipeline, _metadata = model_service.load_model(model_id)
+
+
+def _id_str(value):
+    if pd.isna(value):
+        return None
+    # An int column that picked up a NaN in this chunk was parsed as float; keep "12", not "12.0"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _score_chunk(chunk: pd.DataFrame, id_columns: list, stringify_ids: bool) -> pd.DataFrame:
+    """
+    Scores one chunk inside a worker process.
+    Returns the id columns (if any), the prediction and one probability column per class.
+    CSV/JSONL dtypes are inferred per chunk, so for those inputs the id columns are written
+    as strings to keep the output schema stable.
+    """
+    features = _metadata.get("feature_names") or [c for c in chunk.columns if c != _metadata.get("target_col")]
+    # Same ingest dtypes as training; id columns are left raw so the output schema is stable across chunks
+    X, _ = optimize_dtypes(chunk[features])
+
+    out = chunk[id_columns].reset_index(drop=True) if id_columns else pd.DataFrame(index=range(len(chunk)))
+    if stringify_ids:
+        for col in id_columns:
+            out[col] = out[col].map(_id_str).astype(object)
+    out["prediction"] = _pipeline.predict(X)
+
+    if _metadata.get("problem_type") == "Classification" and hasattr(_pipeline, "predict_proba"):
+        proba = _pipeline.predict_proba(X)
+        classes = getattr(_pipeline, "classes_", range(proba.shape[1]))
+        for i, cls in enumerate(classes):
+            out[f"proba_{cls}"] = proba[:, i]
+
+    return out
+
+
+def input_arrow_types(file_path: str, columns: list) -> dict:
+    """
+    Returns the Arrow types of the given columns when the input declares them (Parquet).
+    """
+    if not file_path.endswith('.parquet') or not columns:
+        return {}
+    import pyarrow.parquet as pq
+    schema = pq.ParquetFile(file_path).schema_arrow
+    return {name: schema.field(name).type for name in columns if name in schema.names}
+
+
+def count_rows(file_path: str):
+    """
+    Returns the row count when it is cheap to get (Parquet footer), otherwise None.
+    """
+    if file_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(file_path).metadata.num_rows
+    return None
+
+
+class _ChunkWriter:
+    """
+    Appends scored chunks to a CSV or Parquet file.
+    """
+
+    def __init__(self, path: str, output_format: str, known_types: dict = None):
+        self.path = path
+        self.output_format = output_format
+        self.known_types = known_types or {}
+        self._parquet_writer = None
+        self._stringified = set()
+        self._header_written = False
+
+    def _open_parquet(self, df: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        # The file schema is fixed by the first chunk. A column that is all null there
+        # would be typed 'null' and reject every later chunk, so take its type from the
+        # input when known, otherwise store it as string.
+        fields = []
+        for field in pa.Table.from_pandas(df, preserve_index=False).schema:
+            if pa.types.is_null(field.type):
+                if field.name in self.known_types:
+                    field = field.with_type(self.known_types[field.name])
+                else:
+                    field = field.with_type(pa.string())
+                    self._stringified.add(field.name)
+            fields.append(field)
+        self._parquet_writer = pq.ParquetWriter(self.path, pa.schema(fields))
+
+    def write(self, df: pd.DataFrame):
+        if self.output_format == "parquet":
+            import pyarrow as pa
+            if self._parquet_writer is None:
+                self._open_parquet(df)
+            for col in self._stringified:
+                df[col] = df[col].map(lambda v: None if pd.isna(v) else str(v))
+            table = pa.Table.from_pandas(df, schema=self._parquet_writer.schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a", header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _persist(job: dict):
+    # Write to a temp file and rename, so pollers never see a half-written status
+    path = os.path.join(OUTPUT_DIR, f"{job['job_id']}.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+
+def create_job(model_id: str, file_path: str, output_format: str = "parquet", id_columns: list = None) -> str:
+    """
+    Validates the request and registers a pending batch job, returning its ID.
+    Raises ValueError for anything that would otherwise only fail once the job runs.
+    """
+    if output_format not in ("parquet", "csv"):
+        raise ValueError("output_format must be 'parquet' or 'csv'")
+    upload_store.check_format(file_path, streaming=True)
+
+    id_columns = id_columns or []
+    missing = [c for c in id_columns if c not in upload_store.read_columns(file_path)]
+    if missing:
+        raise ValueError(f"id_columns not found in input: {missing}")
+
+    job_id = str(uuid.uuid4())
+    job = {
+        "job_id": job_id,
+        "model_id": model_id,
+        "input_file": file_path,
+        "output_file": os.path.join(OUTPUT_DIR, f"{job_id}.{output_format}"),
+        "output_format": output_format,
+        "id_columns": id_columns,
+        "status": "pending",
+        "rows_processed": 0,
+        "rows_total": count_rows(file_path),
+        "rows_per_sec": 0.0,
+        "elapsed_sec": 0.0,
+        "created_at": datetime.now().isoformat(),
+        "error": None,
+    }
+    jobs[job_id] = job
+    _persist(job)
+    return job_id
+
+
+def submit_job(job_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None):
+    """
+    Queues a created job for the dispatcher thread, starting it on first use.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = threading.Thread(target=_dispatch, name="batch-dispatcher", daemon=True)
+            _dispatcher.start()
+    _queue.put((job_id, chunk_size, workers))
+
+
+def _dispatch():
+    while True:
+        job_id, chunk_size, workers = _queue.get()
+        try:
+            run_job(job_id, chunk_size, workers)
+        finally:
+            _queue.task_done()
+
+
+def recover_jobs():
+    """
+    Marks jobs left 'pending' or 'running' by a previous server process as failed.
+    Their queue and pool died with that process, so they will never finish. Call on startup.
+    """
+    for name in os.listdir(OUTPUT_DIR):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(OUTPUT_DIR, name)) as f:
+            job = json.load(f)
+        if job.get("status") not in ("pending", "running") or job["job_id"] in jobs:
+            continue
+        part_path = job["output_file"] + ".part"
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        job["status"] = "failed"
+        job["error"] = "Interrupted by server restart"
+        job["finished_at"] = datetime.now().isoformat()
+        _persist(job)
+
+
+def run_job(job_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None):
+    """
+    Streams the input file through the saved pipeline across a process pool.
+    At most 2 * workers chunks are in flight, so memory stays bounded by chunk_size
+    regardless of file size. Results are written in input order.
+    """
+    job = jobs[job_id]
+    workers = workers or DEFAULT_WORKERS
+    id_columns = job["id_columns"]
+    max_in_flight = workers * 2
+
+    # Only Parquet has a fixed schema; CSV/JSONL ids are written as strings
+    is_parquet = job["input_file"].endswith('.parquet')
+
+    part_path = job["output_file"] + ".part"
+    writer = None
+    job["status"] = "running"
+    _persist(job)
+    start = time.perf_counter()
+
+    def _collect(future):
+        scored = future.result()
+        writer.write(scored)
+        elapsed = time.perf_counter() - start
+        job["rows_processed"] += len(scored)
+        job["elapsed_sec"] = round(elapsed, 2)
+        job["rows_per_sec"] = round(job["rows_processed"] / elapsed, 1) if elapsed > 0 else 0.0
+        _persist(job)
+
+    try:
+        # Id columns that aren't model features can be read as text outright (keeps e.g. leading zeros)
+        features = model_service.load_metadata(job["model_id"]).get("feature_names") or []
+        str_columns = [c for c in id_columns if c not in features]
+
+        writer = _ChunkWriter(part_path, job["output_format"], input_arrow_types(job["input_file"], id_columns))
+        # spawn, not fork: the API server is multi-threaded
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(job["model_id"],)) as pool:
+            try:
+                pending = deque()
+                for chunk in upload_store.iter_chunks(job["input_file"], chunk_size, str_columns):
+                    pending.append(pool.submit(_score_chunk, chunk, id_columns, not is_parquet))
+                    if len(pending) >= max_in_flight:
+                        _collect(pending.popleft())
+                while pending:
+                    _collect(pending.popleft())
+            except Exception:
+                # Don't score the rest of the queue once the job has failed
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        writer.close()
+        os.replace(part_path, job["output_file"])
+        job["status"] = "completed"
+    except Exception as e:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        job["status"] = "failed"
+        job["error"] = str(e)
+
+    job["finished_at"] = datetime.now().isoformat()
+    _persist(job)
+    jobs.pop(job["job_id"], None)
+    return job
+
+
+def get_job(job_id: str) -> dict:
+    """
+    Returns a job's status, falling back to its status file for jobs that have
+    finished or were started by another server process.
+    """
+    if job_id in jobs:
+        # Copy: the dispatcher thread keeps updating the live dict
+        return dict(jobs[job_id])
+    path = os.path.join(OUTPUT_DIR, f"{job_id}.json")
+    if not os.path.exists(path):
+        raise KeyError(f"Job {job_id} not found.")
+    with open(path) as f:
+        return json.load(f)
@@ -26,7 +26,7 @@ def get_profile(df: pd.DataFrame) -> dict:
             "missing_pct": float(n_missing / len(df) * 100),
         }
         
-        if np.issubdtype(col_data.dtype, np.number):
+        if pd.api.types.is_numeric_dtype(col_data) and not pd.api.types.is_bool_dtype(col_data):
             col_profile.update({
                 "mean": float(col_data.mean()),
                 "std": float(col_data.std()),
@@ -38,6 +38,47 @@ def get_profile(df: pd.DataFrame) -> dict:
         
     return profile
 
+def optimize_dtypes(df: pd.DataFrame, max_category_ratio: float = 0.5) -> tuple:
+    """
+    Shrinks the in-memory footprint of a freshly ingested dataframe.
+    Integers (signed) and floats are downcast to the smallest type that holds them, and
+    string columns with few distinct values (relative to row count) become 'category'.
+    Returns the optimized dataframe and a report of what changed and the memory saved.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    optimized = df.copy()
+    converted = {}
+
+    for col in optimized.columns:
+        col_data = optimized[col]
+        old_dtype = str(col_data.dtype)
+
+        if pd.api.types.is_bool_dtype(col_data):
+            continue
+        elif pd.api.types.is_integer_dtype(col_data):
+            # Signed only: unsigned types would wrap on subtraction (e.g. a - b < 0)
+            optimized[col] = pd.to_numeric(col_data, downcast="integer")
+        elif pd.api.types.is_float_dtype(col_data):
+            optimized[col] = pd.to_numeric(col_data, downcast="float")
+        elif pd.api.types.is_object_dtype(col_data) or pd.api.types.is_string_dtype(col_data):
+            n_unique = col_data.nunique()
+            if len(col_data) and n_unique / len(col_data) <= max_category_ratio:
+                optimized[col] = col_data.astype("category")
+
+        new_dtype = str(optimized[col].dtype)
+        if new_dtype != old_dtype:
+            converted[col] = {"from": old_dtype, "to": new_dtype}
+
+    after = int(optimized.memory_usage(deep=True).sum())
+    report = {
+        "memory_before_bytes": before,
+        "memory_after_bytes": after,
+        "memory_saved_bytes": before - after,
+        "memory_saved_pct": float((before - after) / before * 100) if before else 0.0,
+        "converted": converted,
+    }
+    return optimized, report
+
 def infer_problem_type(df: pd.DataFrame, target_col: str = None) -> str:
     """
     Infers if the problem is Classification or Regression based on the target column.
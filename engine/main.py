@@ -1,7 +1,7 @@
-import shutil
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
 import uvicorn
 import os
 import pandas as pd
@@ -18,8 +18,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+@app.on_event("startup")
+def recover_batch_jobs():
+    # Batch jobs queued or running when the server last stopped can never finish
+    import batch_service
+    batch_service.recover_jobs()
 
 @app.get("/")
 def read_root():
@@ -27,18 +30,30 @@ def read_root():
 
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
+    import upload_store
+    # Reject unsupported formats before anything is written to disk
     try:
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # Read file
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file.filename.endswith('.json'):
-            df = pd.read_json(file_path)
-        elif file.filename.endswith('.parquet'):
-            df = pd.read_parquet(file_path)
+        upload_store.check_format(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Stored by content hash, so re-uploading identical data reuses the cached analysis.
+        # Later requests should refer to the upload by the returned file_id.
+        file_id, file_path = upload_store.save_upload(file.file, file.filename)
+
+        cached = upload_store.load_cached_analysis(file_id)
+        if cached is not None:
+            return {
+                "filename": file.filename,
+                "file_id": file_id,
+                **cached,
+                "cached": True,
+                "message": "File uploaded. Reused cached analysis for identical content."
+            }
+
+        # Read file; ingest downcasts numerics and categorizes low-cardinality strings
+        df, ingest_report = upload_store.load_frame(file_path)
             
         # Perform analysis
         from data_analysis import get_profile, infer_problem_type
@@ -51,15 +66,23 @@ async def upload_file(file: UploadFile = File(...)):
         # Generate AI Insights
         from ai_service import generate_data_insights
         insights = generate_data_insights(profile)
-        
-        return {
-            "filename": file.filename, 
+
+        analysis = {
             "problem_type": problem_type,
             "likely_target": likely_target,
             "profile": profile,
             "insights": insights,
+            "ingest": ingest_report,
             "columns": df.columns.tolist(),
             "dtypes": df.dtypes.astype(str).to_dict(),
+        }
+        upload_store.save_cached_analysis(file_id, analysis)
+        
+        return {
+            "filename": file.filename, 
+            "file_id": file_id,
+            **analysis,
+            "cached": False,
             "message": "File uploaded and analyzed."
         }
     except Exception as e:
@@ -75,7 +98,8 @@ async def run_notebook_cell(request: CodeRequest):
 
 class VizRequest(BaseModel):
     type: str # 'dist', 'corr', 'box', 'violin'
-    filename: str
+    file_id: Optional[str] = None # returned by /upload; preferred over filename
+    filename: Optional[str] = None
     column: str = None
     x: str = None
     y: str = None
@@ -83,13 +107,11 @@ class VizRequest(BaseModel):
 @app.post("/visualize")
 async def generate_plot(request: VizRequest):
     import viz_service
-    file_path = os.path.join(UPLOAD_DIR, request.filename)
-    
-    if request.filename.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    # Add other formats
-    
+    import upload_store
     try:
+        file_path = upload_store.resolve_path(request.file_id, request.filename)
+        df, _ = upload_store.load_frame(file_path)
+
         data = []
         if request.type == 'dist':
             data = viz_service.get_distribution_data(df, request.column)
@@ -107,7 +129,8 @@ async def generate_plot(request: VizRequest):
 # ... existing code ...
 
 class TrainRequest(BaseModel):
-    filename: str
+    file_id: Optional[str] = None # returned by /upload; preferred over filename
+    filename: Optional[str] = None
     target_col: str
     problem_type: str
     algorithm_id: str
@@ -119,29 +142,28 @@ async def get_recommendations(request: TrainRequest): # Reusing model for simpli
 
 @app.post("/pipeline/preview")
 async def preview_pipeline(request: dict):
-    # request: { filename: str, steps: list }
+    # request: { file_id: str (from /upload) or filename: str, steps: list }
     import transform_service
+    import upload_store
     from data_analysis import get_profile
     
-    filename = request.get("filename")
     steps = request.get("steps", [])
     
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    try:
+        file_path = upload_store.resolve_path(request.get("file_id"), request.get("filename"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
         
+    # Load Data
     try:
-        # Load Data
-        if filename.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif filename.endswith('.json'):
-            df = pd.read_json(file_path)
-        elif filename.endswith('.parquet'):
-            df = pd.read_parquet(file_path)
-        else:
-             raise HTTPException(status_code=400, detail="Unsupported file format")
+        df, _ = upload_store.load_frame(file_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    try:
         # Apply Transforms
         df_transformed = transform_service.apply_transforms(df, steps)
         
@@ -213,17 +235,57 @@ async def predict(model_id: str, request: dict):
     pass 
     # NOTE: Will refactor train fully in Step 7-9 implementation. For now focusing on preview.
 
+class BatchPredictRequest(BaseModel):
+    file_id: Optional[str] = None # returned by /upload; preferred over filename
+    filename: Optional[str] = None
+    output_format: str = "parquet" # 'parquet' or 'csv'
+    chunk_size: int = Field(50000, gt=0)
+    workers: Optional[int] = Field(None, gt=0, le=os.cpu_count() or 1)
+    id_columns: list = []
+
+@app.post("/batch_predict/{model_id}")
+async def batch_predict(model_id: str, request: BatchPredictRequest):
+    # Streams an uploaded file through the model in chunks; poll /batch_predict/jobs/{job_id} for progress
+    import model_service
+    import batch_service
+    import upload_store
+
+    try:
+        file_path = upload_store.resolve_path(request.file_id, request.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not os.path.exists(os.path.join(model_service.MODEL_DIR, f"{model_id}.pkl")):
+        raise HTTPException(status_code=404, detail="Model not found")
+
+    try:
+        job_id = batch_service.create_job(model_id, file_path, request.output_format, request.id_columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    batch_service.submit_job(job_id, request.chunk_size, request.workers)
+    return batch_service.get_job(job_id)
+
+@app.get("/batch_predict/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    import batch_service
+    try:
+        return batch_service.get_job(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
 # Re-adding the original train endpoint for backward compatibility until full refactor
 @app.post("/train_legacy") 
 async def train_legacy(request: TrainRequest):
     import ml_service
     import model_service
-    
-    file_path = os.path.join(UPLOAD_DIR, request.filename)
-    if request.filename.endswith('.csv'):
-        df = pd.read_csv(file_path)
+    import upload_store
     
     try:
+        file_path = upload_store.resolve_path(request.file_id, request.filename)
+        df, _ = upload_store.load_frame(file_path)
+
         # Train
         metrics, pipeline = ml_service.train_model(df, request.target_col, request.algorithm_id, request.problem_type)
         
@@ -33,8 +33,8 @@ def train_model(df: pd.DataFrame, target_col: str, algorithm_id: str, problem_ty
     y = df[target_col]
     
     # Preprocessing
-    numerical_cols = X.select_dtypes(include=['int64', 'float64']).columns
-    categorical_cols = X.select_dtypes(include=['object', 'bool']).columns
+    numerical_cols = X.select_dtypes(include='number').columns
+    categorical_cols = X.select_dtypes(include=['object', 'bool', 'category']).columns
     
     numerical_transformer = Pipeline(steps=[
         ('imputer', SimpleImputer(strategy='mean')),
@@ -46,6 +46,17 @@ def load_model(model_id):
     
     return pipeline, metadata
 
+def load_metadata(model_id):
+    """
+    Loads only a model's metadata by ID (no pipeline unpickling).
+    """
+    meta_path = os.path.join(MODEL_DIR, f"{model_id}_meta.pkl")
+    
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"Model {model_id} not found.")
+        
+    return joblib.load(meta_path)
+
 def predict(model_id, data):
     """
     Runs prediction using the loaded model.
@@ -32,6 +32,9 @@ def apply_transforms(df: pd.DataFrame, steps: list) -> pd.DataFrame:
                 
                 if col in df_transformed.columns:
                     if strategy == "constant" and fill_value is not None:
+                         # Ingested low-cardinality columns are 'category'; the fill value must be a known category
+                         if isinstance(df_transformed[col].dtype, pd.CategoricalDtype) and fill_value not in df_transformed[col].cat.categories:
+                             df_transformed[col] = df_transformed[col].cat.add_categories([fill_value])
                          df_transformed[col].fillna(fill_value, inplace=True)
                     else:
                         # Simple imputer logic using pandas for simplicity where possible
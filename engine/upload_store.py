@@ -0,0 +1,179 @@
+import os
+import json
+import hashlib
+import tempfile
+
+import pandas as pd
+
+from data_analysis import optimize_dtypes
+
+UPLOAD_DIR = "uploads"
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# Maps an original filename to the file_id of its most recent upload, one file per name
+ALIAS_DIR = os.path.join(UPLOAD_DIR, "aliases")
+os.makedirs(ALIAS_DIR, exist_ok=True)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Supported upload formats: extension -> whether it can be read in chunks (needed by batch scoring)
+FORMATS = {
+    ".csv": True,
+    ".jsonl": True,
+    ".parquet": True,
+    ".json": False,
+}
+
+
+def check_format(filename: str, streaming: bool = False) -> str:
+    """
+    Validates a filename's extension against FORMATS and returns it (lowercased).
+    Raises ValueError for unsupported formats, or non-streamable ones when streaming is required.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported file format (use {', '.join(FORMATS)})")
+    if streaming and not FORMATS[ext]:
+        streamable = [e for e, ok in FORMATS.items() if ok]
+        raise ValueError(f"{ext} files cannot be read in chunks (use {', '.join(streamable)})")
+    return ext
+
+
+def _write_atomic(path: str, text: str):
+    # Write to a temp file and rename, so readers never see a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _alias_path(filename: str) -> str:
+    return os.path.join(ALIAS_DIR, hashlib.sha256(filename.encode()).hexdigest())
+
+
+def save_upload(fileobj, filename: str) -> tuple:
+    """
+    Streams an upload to disk, storing it under the SHA-256 of its content so
+    identical content is only kept once. The original filename is recorded as an
+    alias so older clients can keep referring to it.
+    Returns (file_id, path).
+    """
+    ext = check_format(filename)
+    digest = hashlib.sha256()
+
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    with os.fdopen(fd, "wb") as buffer:
+        while True:
+            block = fileobj.read(HASH_CHUNK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            buffer.write(block)
+
+    file_id = f"{digest.hexdigest()}{ext}"
+    path = upload_path(file_id)
+
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+
+    _write_atomic(_alias_path(filename), file_id)
+
+    return file_id, path
+
+
+def upload_path(file_id: str) -> str:
+    """
+    Returns the on-disk path for an upload given its file_id.
+    """
+    return os.path.join(UPLOAD_DIR, os.path.basename(file_id))
+
+
+def resolve_path(file_id: str = None, filename: str = None) -> str:
+    """
+    Returns the on-disk path for an upload. Prefers file_id; otherwise resolves the
+    original filename through its alias, falling back to the raw path for uploads
+    stored before content addressing.
+    """
+    if file_id:
+        return upload_path(file_id)
+    if not filename:
+        raise ValueError("Either file_id or filename is required")
+
+    alias = _alias_path(filename)
+    if os.path.exists(alias):
+        with open(alias) as f:
+            return upload_path(f.read().strip())
+    return upload_path(filename)
+
+
+def load_frame(path: str) -> tuple:
+    """
+    Reads an uploaded file and runs the ingest stage (compact dtypes) on it.
+    Every endpoint reading uploads goes through here so they all see the same dtypes.
+    Returns the dataframe and the ingest report.
+    """
+    ext = check_format(path)
+    if ext == '.csv':
+        df = pd.read_csv(path)
+    elif ext == '.jsonl':
+        df = pd.read_json(path, lines=True)
+    elif ext == '.json':
+        df = pd.read_json(path)
+    elif ext == '.parquet':
+        df = pd.read_parquet(path)
+    return optimize_dtypes(df)
+
+
+def iter_chunks(path: str, chunk_size: int, str_columns: list = None):
+    """
+    Streams an upload as DataFrame chunks so the whole file is never held in memory.
+    str_columns are read as text in CSV input, so their dtype can't change between chunks.
+    """
+    ext = check_format(path, streaming=True)
+    if ext == '.csv':
+        dtype = {c: str for c in str_columns} if str_columns else None
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+    elif ext == '.jsonl':
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def read_columns(path: str) -> list:
+    """
+    Returns an upload's column names without reading its rows.
+    """
+    ext = check_format(path)
+    if ext == '.csv':
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    elif ext == '.jsonl':
+        return next(pd.read_json(path, lines=True, chunksize=1)).columns.tolist()
+    elif ext == '.json':
+        return pd.read_json(path).columns.tolist()
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+
+
+def _analysis_path(file_id: str) -> str:
+    # Keyed by file_id (hash + extension): the same bytes parse differently per format
+    return os.path.join(UPLOAD_DIR, f"{os.path.basename(file_id)}.analysis.json")
+
+
+def load_cached_analysis(file_id: str):
+    """
+    Returns the cached profile/insights for this upload, or None.
+    """
+    path = _analysis_path(file_id)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cached_analysis(file_id: str, analysis: dict):
+    _write_atomic(_analysis_path(file_id), json.dumps(analysis))
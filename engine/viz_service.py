@@ -28,7 +28,7 @@ def get_distribution_data(data: pd.DataFrame, column: str):
     return result
 
 def get_correlation_data(data: pd.DataFrame):
-    numeric_df = data.select_dtypes(include=['float64', 'int64'])
+    numeric_df = data.select_dtypes(include='number')
     if numeric_df.empty:
         return []
     